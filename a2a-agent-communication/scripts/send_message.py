@@ -7,16 +7,109 @@ Send A2A messages to Agent Zero with support for:
 - Multiple authentication methods
 """
 
+import os
 import sys
 import json
-import uuid
+import stat
 import argparse
-import base64
 import asyncio
+import tempfile
+import threading
 import httpx
 from pathlib import Path
 from typing import Optional
 
+try:
+    import pybase64 as base64  # SIMD-accelerated, same API as stdlib
+except ImportError:
+    import base64
+
+try:
+    import orjson  # Faster parse/serialize on the request/response path
+except ImportError:
+    orjson = None
+
+try:
+    import h2  # noqa: F401  Lets httpx negotiate HTTP/2
+    HTTP2 = True
+except ImportError:
+    HTTP2 = False
+
+try:
+    from uvloop import run as _run  # Faster event loop
+except ImportError:
+    _run = asyncio.run
+
+# Built once per process and shared by every client, so the CA bundle is
+# loaded a single time; httpx's helper keeps its certifi/SSL_CERT_FILE trust
+_SSL_CONTEXT = httpx.create_ssl_context()
+
+# Read size for attachment encoding; a multiple of 3 so no padding mid-stream
+ENCODE_CHUNK_SIZE = 57 * 1024
+
+# Attachments larger than this in total are encoded while the request uploads
+STREAM_THRESHOLD = 8 * 1024 * 1024
+STREAM_CHUNK_SIZE = 16 * ENCODE_CHUNK_SIZE
+
+# Number of encoded attachments kept in memory for re-sends
+ENCODE_CACHE_SIZE = 8
+
+# Pool of random bytes for message IDs, refilled 64 UUIDs at a time
+_UUID_BATCH = 64
+_rand_pool = bytearray()
+_rand_offset = 0
+_rand_lock = threading.Lock()
+
+
+def _new_uuid4() -> str:
+    """Return a random (version 4) UUID string drawn from a batched pool."""
+    global _rand_pool, _rand_offset
+    with _rand_lock:
+        if _rand_offset + 16 > len(_rand_pool):
+            _rand_pool = bytearray(os.urandom(16 * _UUID_BATCH))
+            _rand_offset = 0
+        b = _rand_pool[_rand_offset:_rand_offset + 16]
+        _rand_offset += 16
+    b[6] = (b[6] & 0x0f) | 0x40  # version 4
+    b[8] = (b[8] & 0x3f) | 0x80  # RFC 4122 variant
+    h = b.hex()
+    return f"{h[0:8]}-{h[8:12]}-{h[12:16]}-{h[16:20]}-{h[20:32]}"
+
+
+def _reset_uuid_pool():
+    """Drop the inherited pool so a forked child never reuses parent IDs."""
+    global _rand_pool, _rand_offset, _rand_lock
+    _rand_pool = bytearray()
+    _rand_offset = 0
+    # The lock may have been held by another parent thread at fork time
+    _rand_lock = threading.Lock()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_uuid_pool)
+
+
+def _read_encoded(f, remaining: int) -> bytes:
+    """Read the next chunk (at most remaining bytes) and base64-encode it."""
+    chunk = f.read(min(STREAM_CHUNK_SIZE, remaining))
+    return base64.b64encode(chunk) if chunk else b""
+
+
+def _json_loads(data: bytes):
+    """Parse JSON from bytes, using orjson when available."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def _json_dumps(obj, indent: bool = False) -> bytes:
+    """Serialize JSON to bytes, compact unless indent is set."""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 if indent else 0)
+    if indent:
+        return json.dumps(obj, indent=2).encode()
+    return json.dumps(obj, separators=(",", ":")).encode()
+
 
 class A2AClient:
     """Simple A2A client for Agent Zero."""
@@ -25,50 +118,164 @@ class A2AClient:
         self.base_url = base_url.rstrip('/')
         self.token = token
         self.timeout = timeout
+        self._url = f"{self.base_url}/a2a/t-{self.token}"
         self.context_id: Optional[str] = None
         self.session_file = Path.home() / ".a2a_sessions.json"
+        self._client = httpx.AsyncClient(
+            verify=_SSL_CONTEXT,
+            http2=HTTP2,
+            timeout=timeout,
+            limits=httpx.Limits(
+                max_keepalive_connections=5,
+                max_connections=10,
+                keepalive_expiry=30
+            )
+        )
+        # Base64 of attachments keyed by (path, mtime, size), least recent first
+        self._b64_cache: dict = {}
+        self._b64_cache_lock = threading.Lock()
         self._load_sessions()
     
+    async def aclose(self):
+        """Close the underlying HTTP connection pool."""
+        await self._client.aclose()
+    
+    async def __aenter__(self):
+        return self
+    
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.aclose()
+    
     def _load_sessions(self):
         """Load saved context IDs from file."""
-        if self.session_file.exists():
-            try:
-                data = json.loads(self.session_file.read_text())
-                self.context_id = data.get(self.base_url)
-            except Exception:
-                pass
+        self._sessions: dict = {}
+        try:
+            data = _json_loads(self.session_file.read_bytes())
+            self.context_id = data.get(self.base_url)
+            self._sessions = data
+        except Exception:
+            # Missing or unreadable file: start with no saved sessions
+            pass
     
     def _save_sessions(self):
         """Save context IDs to file."""
-        data = {}
-        if self.session_file.exists():
+        if self._sessions.get(self.base_url) == self.context_id:
+            return
+        self._sessions[self.base_url] = self.context_id
+        
+        # Write to a temp file and swap it in so a crash can't truncate sessions;
+        # the name is unique so concurrent processes don't move each other's file
+        fd, tmp_name = tempfile.mkstemp(
+            dir=self.session_file.parent, prefix=".a2a_sessions.", suffix=".tmp"
+        )
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(_json_dumps(self._sessions))
+            os.replace(tmp_name, self.session_file)
+        except BaseException:
             try:
-                data = json.loads(self.session_file.read_text())
-            except Exception:
+                os.unlink(tmp_name)
+            except OSError:
                 pass
-        data[self.base_url] = self.context_id
-        self.session_file.write_text(json.dumps(data, indent=2))
+            raise
     
     def _make_url(self) -> str:
-        """Build A2A URL with token."""
-        return f"{self.base_url}/a2a/t-{self.token}"
+        """Return the A2A URL with token, built once in __init__."""
+        return self._url
     
-    def _encode_file(self, path: str) -> dict:
-        """Encode file as base64 for attachment."""
+    def _check_file(self, path: str) -> Path:
+        """Resolve an attachment path, failing early if it is missing."""
         file_path = Path(path)
         if not file_path.exists():
             raise FileNotFoundError(f"File not found: {path}")
+        return file_path
+    
+    def _encode_file(self, file_path: Path, st: os.stat_result) -> dict:
+        """Encode file as base64 for attachment.
+        
+        file_path and st come from the checks already done in send_message.
+        """
+        # Unchanged files re-sent across turns reuse their earlier encoding.
+        # Only regular files: pipes and procfs entries can change content
+        # without changing their stat key
+        cacheable = stat.S_ISREG(st.st_mode)
+        key = (str(file_path.resolve()), st.st_mtime_ns, st.st_size)
+        encoded = None
+        if cacheable:
+            with self._b64_cache_lock:
+                encoded = self._b64_cache.pop(key, None)
+                if encoded is not None:
+                    self._b64_cache[key] = encoded  # Mark most recently used
+        
+        if encoded is None:
+            # Encode in chunks so the raw file is never held in memory in full
+            buf = bytearray()
+            with file_path.open("rb") as f:
+                while chunk := f.read(ENCODE_CHUNK_SIZE):
+                    buf += base64.b64encode(chunk)
+            encoded = buf.decode("ascii")
+            
+            if cacheable:
+                with self._b64_cache_lock:
+                    self._b64_cache[key] = encoded
+                    while len(self._b64_cache) > ENCODE_CACHE_SIZE:
+                        del self._b64_cache[next(iter(self._b64_cache))]
         
-        content = file_path.read_bytes()
+        # The part is built per call so each send keeps the name it was given,
+        # even when a symlink shares the cached encoding of its target
         return {
             "kind": "file",
             "file": {
                 "name": file_path.name,
                 "mimeType": "application/octet-stream",
-                "bytes": base64.b64encode(content).decode()
+                "bytes": encoded
             }
         }
     
+    def _stream_body(self, message: dict, files: list) -> tuple:
+        """Build a streamed JSON request body, encoding attachments as it uploads.
+        
+        files holds (path, stat) pairs taken before the upload starts, so the
+        body length is known up front. Returns (content_length, body_iter).
+        """
+        fields = {k: v for k, v in message.items() if k != "parts"}
+        
+        # Everything but the parts goes first, leaving the parts array open
+        head = (
+            b'{"message":' + _json_dumps(fields)[:-1] + b',"parts":['
+            + b",".join(_json_dumps(part) for part in message["parts"])
+        )
+        file_heads = [
+            b',{"kind":"file","file":{"name":' + _json_dumps(file_path.name)
+            + b',"mimeType":"application/octet-stream","bytes":"'
+            for file_path, _ in files
+        ]
+        file_tail = b'"}}'
+        tail = b"]}}"
+        
+        # Base64 emits 4 bytes per started group of 3 input bytes
+        length = len(head) + len(tail) + sum(
+            len(file_head) + 4 * -(-st.st_size // 3) + len(file_tail)
+            for file_head, (_, st) in zip(file_heads, files)
+        )
+        
+        async def body_iter():
+            yield head
+            for file_head, (file_path, st) in zip(file_heads, files):
+                yield file_head
+                remaining = st.st_size
+                with file_path.open("rb") as f:
+                    while remaining > 0:
+                        chunk = await asyncio.to_thread(_read_encoded, f, remaining)
+                        if not chunk:
+                            break
+                        remaining -= STREAM_CHUNK_SIZE
+                        yield chunk
+                yield file_tail
+            yield tail
+        
+        return length, body_iter()
+    
     async def send_message(
         self,
         text: str,
@@ -80,34 +287,58 @@ class A2AClient:
         # Build message parts
         parts = [{"kind": "text", "text": text}]
         
-        if attachments:
-            for path in attachments:
-                parts.append(self._encode_file(path))
+        # Stat each attachment once; a streamed body reuses these results
+        files = []
+        for path in attachments or ():
+            file_path = self._check_file(path)
+            files.append((file_path, file_path.stat()))
+        
+        # Only regular files have a size that can be trusted for streaming
+        stream_files = (
+            all(stat.S_ISREG(st.st_mode) for _, st in files)
+            and sum(st.st_size for _, st in files) > STREAM_THRESHOLD
+        )
+        
+        if attachments and not stream_files:
+            # Encode off the event loop; files are read and encoded in parallel
+            encoded = await asyncio.gather(
+                *(
+                    asyncio.to_thread(self._encode_file, file_path, st)
+                    for file_path, st in files
+                )
+            )
+            parts.extend(encoded)
         
         # Build message
         message = {
             "role": "user",
             "parts": parts,
             "kind": "message",
-            "message_id": str(uuid.uuid4())
+            "message_id": _new_uuid4()
         }
         
         # Include context_id if available and requested
         if use_context and self.context_id:
             message["context_id"] = self.context_id
         
-        payload = {"message": message}
+        headers = {"Content-Type": "application/json"}
+        if stream_files:
+            # Large attachments are encoded chunk by chunk during the upload;
+            # an explicit length avoids a chunked transfer encoding
+            length, body = self._stream_body(message, files)
+            headers["Content-Length"] = str(length)
+        else:
+            body = _json_dumps({"message": message})
         
         # Send request
         url = self._make_url()
-        async with httpx.AsyncClient(timeout=self.timeout) as client:
-            resp = await client.post(
-                url,
-                json=payload,
-                headers={"Content-Type": "application/json"}
-            )
-            resp.raise_for_status()
-            data = resp.json()
+        resp = await self._client.post(
+            url,
+            content=body,
+            headers=headers
+        )
+        resp.raise_for_status()
+        data = _json_loads(resp.content)
         
         # Update and save context_id
         new_context = data.get("result", {}).get("context_id")
@@ -124,11 +355,18 @@ class A2AClient:
             return "(no response)"
         
         # Get last assistant message
-        for msg in reversed(history):
-            if msg.get("role") == "agent":
-                parts = msg.get("parts", [])
-                texts = [p.get("text", "") for p in parts if p.get("kind") == "text"]
-                return "\n".join(texts) if texts else "(no text response)"
+        for i in range(len(history) - 1, -1, -1):
+            msg = history[i]
+            if msg.get("role") != "agent":
+                continue
+            texts = []
+            append = texts.append
+            for p in msg.get("parts") or ():
+                if p.get("kind") == "text":
+                    t = p.get("text")
+                    if t:
+                        append(t)
+            return "\n".join(texts) if texts else "(no text response)"
         
         return "(no agent response)"
 
@@ -145,34 +383,33 @@ def main():
     
     args = parser.parse_args()
     
-    client = A2AClient(args.url, args.token, args.timeout)
-    
     async def run():
         try:
-            print(f"📤 Sending message to {args.url}...")
-            if args.file:
-                print(f"   Attachments: {', '.join(args.file)}")
-            
-            result = await client.send_message(
-                text=args.message,
-                attachments=args.file,
-                use_context=not args.no_context
-            )
-            
-            if args.json:
-                print(json.dumps(result, indent=2))
-            else:
-                response_text = client.extract_response_text(result)
-                print(f"\n📨 Response:")
-                print(f"{response_text}")
-                print(f"\n📝 Context ID: {client.context_id}")
+            async with A2AClient(args.url, args.token, args.timeout) as client:
+                print(f"📤 Sending message to {args.url}...")
+                if args.file:
+                    print(f"   Attachments: {', '.join(args.file)}")
+                
+                result = await client.send_message(
+                    text=args.message,
+                    attachments=args.file,
+                    use_context=not args.no_context
+                )
+                
+                if args.json:
+                    print(_json_dumps(result, indent=True).decode())
+                else:
+                    response_text = client.extract_response_text(result)
+                    print(f"\n📨 Response:")
+                    print(f"{response_text}")
+                    print(f"\n📝 Context ID: {client.context_id}")
             
             return 0
         except Exception as e:
             print(f"❌ Error: {e}", file=sys.stderr)
             return 1
     
-    return asyncio.run(run())
+    return _run(run())
 
 
 if __name__ == "__main__":
@@ -4,76 +4,130 @@ Validate A2A connectivity to an Agent Zero instance.
 Tests all 4 authentication methods and reports results.
 """
 
+import io
 import sys
+import json
 import argparse
 import httpx
 import asyncio
 from urllib.parse import urljoin, urlparse
 
+try:
+    import orjson  # Faster parsing of agent cards
+except ImportError:
+    orjson = None
 
-async def test_agent_card(url: str, headers: dict = None, description: str = "") -> bool:
-    """Test retrieving agent card from A2A endpoint."""
+try:
+    import h2  # noqa: F401  Lets httpx multiplex probes over HTTP/2
+    HTTP2 = True
+except ImportError:
+    HTTP2 = False
+
+try:
+    from uvloop import run as _run  # Faster event loop
+except ImportError:
+    _run = asyncio.run
+
+# Built once at import and used by the probe client; httpx's helper keeps
+# its certifi/SSL_CERT_FILE trust store
+_SSL_CONTEXT = httpx.create_ssl_context()
+
+
+def _json_loads(data: bytes):
+    """Parse JSON from bytes, using orjson when available."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+async def test_agent_card(
+    client: httpx.AsyncClient,
+    semaphore: asyncio.Semaphore,
+    url: str,
+    headers: dict = None,
+    description: str = ""
+) -> tuple:
+    """Test retrieving agent card from A2A endpoint.
+    
+    Returns (ok, lines) so the caller can print results in a stable order.
+    """
     agent_json_url = urljoin(url.rstrip('/') + '/', '.well-known/agent.json')
     
-    try:
-        async with httpx.AsyncClient(timeout=10.0) as client:
+    async with semaphore:
+        try:
             resp = await client.get(agent_json_url, headers=headers or {})
             if resp.status_code == 200:
-                data = resp.json()
-                print(f"  ✅ {description}")
-                print(f"     Agent: {data.get('name', 'Unknown')}")
-                print(f"     Description: {data.get('description', 'No description')[:60]}...")
-                return True
+                data = _json_loads(resp.content)
+                desc = data.get('description', 'No description')
+                return True, [
+                    f"  ✅ {description}",
+                    f"     Agent: {data.get('name', 'Unknown')}",
+                    f"     Description: {desc:.60}...",
+                ]
             else:
-                print(f"  ❌ {description}: HTTP {resp.status_code}")
-                return False
-    except Exception as e:
-        print(f"  ❌ {description}: {e}")
-        return False
+                return False, [f"  ❌ {description}: HTTP {resp.status_code}"]
+        except Exception as e:
+            return False, [f"  ❌ {description}: {e}"]
 
 
-async def validate_connection(base_url: str, token: str = None):
+async def validate_connection(base_url: str, token: str = None, max_concurrency: int = 4):
     """Test all authentication methods."""
     print(f"\n🔍 Validating A2A connection to: {base_url}")
     print("=" * 60)
     
-    results = []
-    
-    # Method 1: Token URL (if provided)
-    if token:
-        url = f"{base_url}/a2a/t-{token}"
-        ok = await test_agent_card(url, description="Token URL method")
-        results.append(("Token URL", ok))
+    # Normalize once; every probe URL is built from this
+    base_url = base_url.rstrip('/')
     
-    # Method 2: Bearer token
+    # (method, url, headers, description) for each auth method to probe
+    probes = []
     if token:
-        headers = {"Authorization": f"Bearer {token}"}
-        url = f"{base_url}/a2a"
-        ok = await test_agent_card(url, headers=headers, description="Bearer token")
-        results.append(("Bearer", ok))
+        probes = [
+            # Method 1: Token URL
+            ("Token URL", f"{base_url}/a2a/t-{token}", None, "Token URL method"),
+            # Method 2: Bearer token
+            ("Bearer", f"{base_url}/a2a", {"Authorization": f"Bearer {token}"}, "Bearer token"),
+            # Method 3: X-API-KEY header
+            ("X-API-KEY", f"{base_url}/a2a", {"X-API-KEY": token}, "X-API-KEY header"),
+            # Method 4: Query parameter
+            ("Query param", f"{base_url}/a2a/.well-known/agent.json?api_key={token}", None, "Query parameter"),
+        ]
     
-    # Method 3: X-API-KEY header
-    if token:
-        headers = {"X-API-KEY": token}
-        url = f"{base_url}/a2a"
-        ok = await test_agent_card(url, headers=headers, description="X-API-KEY header")
-        results.append(("X-API-KEY", ok))
+    # Probes are independent, so run them concurrently over one client,
+    # capped so rate-limited servers don't reject the burst
+    semaphore = asyncio.Semaphore(max_concurrency)
+    limits = httpx.Limits(max_connections=max_concurrency)
+    async with httpx.AsyncClient(
+        verify=_SSL_CONTEXT, http2=HTTP2, timeout=10.0, limits=limits
+    ) as client:
+        outcomes = await asyncio.gather(
+            *(
+                test_agent_card(client, semaphore, url, headers, desc)
+                for _, url, headers, desc in probes
+            ),
+            return_exceptions=True
+        )
     
-    # Method 4: Query parameter
-    if token:
-        url = f"{base_url}/a2a/.well-known/agent.json?api_key={token}"
-        ok = await test_agent_card(url, description="Query parameter")
-        results.append(("Query param", ok))
+    # Collect the report and write it to stdout in one go
+    buf = io.StringIO()
+    results = []
+    for (method, _, _, desc), outcome in zip(probes, outcomes):
+        if isinstance(outcome, BaseException):
+            outcome = (False, [f"  ❌ {desc}: {outcome}"])
+        ok, lines = outcome
+        for line in lines:
+            print(line, file=buf)
+        results.append((method, ok))
     
     # Summary
-    print("\n📊 Results Summary")
-    print("-" * 40)
+    print("\n📊 Results Summary", file=buf)
+    print("-" * 40, file=buf)
     passed = sum(1 for _, ok in results if ok)
     for method, ok in results:
         status = "✅" if ok else "❌"
-        print(f"  {status} {method}")
-    print(f"\n{passed}/{len(results)} methods working")
+        print(f"  {status} {method}", file=buf)
+    print(f"\n{passed}/{len(results)} methods working", file=buf)
     
+    sys.stdout.write(buf.getvalue())
     return passed > 0
 
 
@@ -84,8 +138,12 @@ def main():
     parser.add_argument("url", help="Agent Zero base URL (e.g., http://localhost:8080)")
     parser.add_argument("--token", help="A2A token (16-char alphanumeric)")
     parser.add_argument("--api-key", dest="token", help="Alias for --token")
+    parser.add_argument("--max-concurrency", type=int, default=4,
+                        help="Maximum probes in flight at once (default: 4)")
     
     args = parser.parse_args()
+    if args.max_concurrency < 1:
+        parser.error("--max-concurrency must be at least 1")
     
     # Auto-detect token from URL if present
     token = args.token
@@ -95,7 +153,7 @@ def main():
             token = parsed.path.replace("/a2a/t-", "").rstrip("/")
             print(f"🔑 Auto-detected token from URL: {token}")
     
-    result = asyncio.run(validate_connection(args.url, token))
+    result = _run(validate_connection(args.url, token, args.max_concurrency))
     sys.exit(0 if result else 1)
 
 